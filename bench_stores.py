@@ -0,0 +1,195 @@
+"""
+Бенчмарк выборок по магазинам и организациям (мульти-арендность).
+
+Для каждого числа магазинов (по умолчанию 10 и 100) база пересоздается и заполняется:
+организации, магазины, товары, строки store_stock для каждого магазина и контрагенты.
+Затем для первого и последнего магазина замеряются:
+  - сам запрос товаров магазина (store_products_query) и запрос контрагентов
+    организации (organization_counterparties_query) - время на один запрос, мкс;
+  - эндпоинты GET /api/products/ (X-Store-Id) и GET /api/counterparties/
+    (X-Organization-Id) - мс. Сюда входит ленивая загрузка details по каждому товару,
+    поэтому для оценки индекса важнее время самих запросов.
+В конце печатается план выполнения (EXPLAIN) обоих запросов.
+
+Если выборка идет по индексу с ключом арендатора, время запросов не должно расти
+с числом магазинов (и строк store_stock).
+
+Запуск:
+    python bench_stores.py
+    python bench_stores.py --stores 10 100 1000 --products 200 --repeat 50
+
+По умолчанию используется SQLite-файл bench_stores.db (пересоздается при каждом запуске).
+Для PostgreSQL задайте BENCH_DATABASE_URL на ПУСТУЮ базу: таблицы в ней пересоздаются.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+BENCH_DATABASE_URL = os.environ.get('BENCH_DATABASE_URL', 'sqlite:///./bench_stores.db')
+# models.py читает DATABASE_URL при импорте, поэтому подменяем его до импорта
+os.environ['DATABASE_URL'] = BENCH_DATABASE_URL
+
+if BENCH_DATABASE_URL.startswith('sqlite:///'):
+    db_path = BENCH_DATABASE_URL.replace('sqlite:///', '', 1)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+from sqlalchemy import insert, text
+from fastapi.testclient import TestClient
+
+from models import engine, Base, create_db_and_tables, SessionLocal, Product, Counterparty, Category
+from models import Organization, Store, StoreStock, OrganizationCounterparty
+from main import app, store_products_query, organization_counterparties_query
+
+
+def reset_db():
+    """Пересоздает таблицы перед очередным прогоном."""
+    Base.metadata.drop_all(bind=engine)
+    create_db_and_tables()
+
+
+def seed(stores: int, organizations: int, products: int, counterparties: int) -> list[Store]:
+    """Заполняет БД тестовыми данными и возвращает магазины в порядке создания."""
+    db = SessionLocal()
+    try:
+        category = Category(name="Бенчмарк")
+        db.add(category)
+        db.flush()
+
+        db.execute(insert(Organization), [
+            {"name": f"Организация {i + 1}"} for i in range(organizations)
+        ])
+        organization_ids = [o.id for o in db.query(Organization).order_by(Organization.id)]
+
+        db.execute(insert(Store), [
+            {"organization_id": organization_ids[i % organizations], "name": f"Магазин {i + 1}"}
+            for i in range(stores)
+        ])
+        db.execute(insert(Product), [
+            {"name": f"Товар {i + 1}", "sku": f"BENCH-{i + 1}", "price": 100.0 + i,
+             "stock": 0.0, "is_active": True, "category_id": category.id}
+            for i in range(products)
+        ])
+        store_ids = [s.id for s in db.query(Store).order_by(Store.id)]
+        product_ids = [p.id for p in db.query(Product).order_by(Product.id)]
+
+        # Каждый магазин ведет весь ассортимент
+        db.execute(insert(StoreStock), [
+            {"store_id": store_id, "product_id": product_id, "price": None, "stock": float(store_id)}
+            for store_id in store_ids for product_id in product_ids
+        ])
+
+        # Контрагенты: часть привязана к организациям, часть общие
+        db.execute(insert(Counterparty), [
+            {"name": f"Контрагент {i + 1}", "bin": f"{i + 1:012d}"}
+            for i in range(counterparties * (organizations + 1))
+        ])
+        counterparty_ids = [c.id for c in db.query(Counterparty).order_by(Counterparty.id)]
+        db.execute(insert(OrganizationCounterparty), [
+            {"organization_id": organization_id, "counterparty_id": counterparty_ids[n * counterparties + i]}
+            for n, organization_id in enumerate(organization_ids) for i in range(counterparties)
+        ])
+
+        db.commit()
+        return db.query(Store).order_by(Store.id).all()
+    finally:
+        db.close()
+
+
+def time_query(statement, repeat: int) -> float:
+    """Медиана времени выполнения SQL-запроса (без ORM и ленивых загрузок), мкс."""
+    timings = []
+    with engine.connect() as connection:
+        connection.execute(statement).fetchall()  # прогрев
+        for _ in range(repeat):
+            started = time.perf_counter()
+            connection.execute(statement).fetchall()
+            timings.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(timings)
+
+
+def time_endpoint(client: TestClient, url: str, headers: dict, repeat: int) -> float:
+    """Медиана времени ответа эндпоинта, мс."""
+    client.get(url, headers=headers).raise_for_status()  # прогрев
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return statistics.median(timings)
+
+
+def explain(statement) -> list[str]:
+    """План выполнения запроса (EXPLAIN QUERY PLAN для SQLite, EXPLAIN для PostgreSQL)."""
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as connection:
+        rows = connection.execute(text(prefix + sql)).fetchall()
+    # SQLite: (id, parent, notused, detail), PostgreSQL: (строка плана,)
+    return [str(row[-1]) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк выборок по магазинам")
+    parser.add_argument("--stores", type=int, nargs="+", default=[10, 100], help="числа магазинов для сравнения")
+    parser.add_argument("--organizations", type=int, default=10)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--counterparties", type=int, default=20, help="на организацию (+ столько же общих)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    db = SessionLocal()
+    try:
+        if db.query(Store).count() > 0:
+            sys.exit("База не пустая: укажите BENCH_DATABASE_URL на пустую базу.")
+    finally:
+        db.close()
+
+    client = TestClient(app)
+    print(f"БД: {BENCH_DATABASE_URL}, товаров: {args.products}, повторов: {args.repeat}")
+    print(
+        f"\n{'магазинов':>10}{'store_stock':>13}{'магазин':>10}"
+        f"{'товары SQL, мкс':>17}{'контрагенты SQL, мкс':>22}"
+        f"{'/api/products/, мс':>20}{'/api/counterparties/, мс':>26}"
+    )
+
+    for store_count in args.stores:
+        reset_db()
+        organizations = min(args.organizations, store_count)
+        stores = seed(store_count, organizations, args.products, args.counterparties)
+
+        db = SessionLocal()
+        try:
+            for label, store in (("первый", stores[0]), ("последний", stores[-1])):
+                products_statement = store_products_query(db, store.id).statement
+                counterparties_statement = organization_counterparties_query(db, store.organization_id).statement
+                print(
+                    f"{store_count:>10}{store_count * args.products:>13}{label:>10}"
+                    f"{time_query(products_statement, args.repeat):>17.0f}"
+                    f"{time_query(counterparties_statement, args.repeat):>22.0f}"
+                    f"{time_endpoint(client, '/api/products/', {'X-Store-Id': str(store.id)}, args.repeat):>20.2f}"
+                    f"{time_endpoint(client, '/api/counterparties/', {'X-Organization-Id': str(store.organization_id)}, args.repeat):>26.2f}"
+                )
+        finally:
+            db.close()
+
+    # План для последнего прогона: ожидается поиск по индексу с ключом арендатора
+    db = SessionLocal()
+    try:
+        store = stores[-1]
+        print(f"\nEXPLAIN: товары магазина {store.id}")
+        for line in explain(store_products_query(db, store.id).statement):
+            print(f"  {line}")
+        print(f"EXPLAIN: контрагенты организации {store.organization_id}")
+        for line in explain(organization_counterparties_query(db, store.organization_id).statement):
+            print(f"  {line}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os
+from sqlalchemy import and_, or_, exists
 from sqlalchemy.exc import IntegrityError
-from fastapi import HTTPException, FastAPI, Depends, Request
+from fastapi import HTTPException, FastAPI, Depends, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -12,6 +13,7 @@ from pathlib import Path
 
 # --- ИСПРАВЛЕННЫЕ ИМПОРТЫ: ВАЖНО, чтобы импорты из models работали с ProductDetail ---
 from models import create_db_and_tables, SessionLocal, Product, Counterparty, Category, ProductDetail # <-- ДОБАВЛЕН ProductDetail
+from models import Organization, Store, StoreStock, OrganizationCounterparty
 
 # --- Инициализация FastAPI и Настройки ---
 
@@ -112,6 +114,45 @@ class CounterpartyOut(CounterpartyBase):
     class Config:
         from_attributes = True
 
+# 🏢 СХЕМЫ ОРГАНИЗАЦИЙ И МАГАЗИНОВ (мульти-арендность)
+class OrganizationBase(BaseModel):
+    name: str = Field(..., max_length=255)
+    bin: str | None = Field(default=None, max_length=12)
+
+class OrganizationCreate(OrganizationBase):
+    pass
+
+class OrganizationOut(OrganizationBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class StoreBase(BaseModel):
+    name: str = Field(..., max_length=255)
+    organization_id: int
+
+class StoreCreate(StoreBase):
+    pass
+
+class StoreOut(StoreBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class StoreStockBase(BaseModel):
+    # Если цена не задана, используется общая цена товара
+    price: Optional[float] = Field(default=None, gt=0)
+    stock: float = Field(default=0.0)
+
+class StoreStockOut(StoreStockBase):
+    store_id: int
+    product_id: int
+
+    class Config:
+        from_attributes = True
+
 # --- Инициализация FastAPI и CORS (без изменений) ---
 app = FastAPI(title="VORTEX POS API")
 
@@ -124,15 +165,99 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- Управление Сессией Базы Данных (без изменений) ---
+# --- Управление Сессией Базы Данных ---
+
+# TENANT_REQUIRED=1 - запросы к данным арендаторов без X-Organization-Id / X-Store-Id отклоняются.
+# По умолчанию выключено: страницы каталога (products.html, add_hose.html) пока не передают контекст.
+TENANT_REQUIRED = os.environ.get('TENANT_REQUIRED', '0') == '1'
+
+def get_global_db():
+    """Сессия без контекста арендатора - для общих справочников (категории, организации)."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_db(
+    x_organization_id: int | None = Header(default=None),
+    x_store_id: int | None = Header(default=None),
+):
+    """
+    Открывает сессию в контексте арендатора.
+    Организация и магазин передаются заголовками X-Organization-Id / X-Store-Id
+    и сохраняются в db.info; эндпоинты фильтруют и пишут данные по этому контексту.
 
-def get_db():
+    Без заголовков (и без TENANT_REQUIRED=1) сессия работает в ВРЕМЕННОМ режиме совместимости
+    со старыми страницами: без фильтров, как до разделения по организациям.
+    """
+    if TENANT_REQUIRED and x_organization_id is None and x_store_id is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Не указан контекст: передайте заголовок X-Organization-Id или X-Store-Id"
+        )
+    
     db = SessionLocal()
     try:
+        organization_id = x_organization_id
+        if x_store_id is not None:
+            store = db.get(Store, x_store_id)
+            if store is None:
+                raise HTTPException(status_code=404, detail="Магазин не найден")
+            if organization_id is not None and store.organization_id != organization_id:
+                raise HTTPException(status_code=403, detail="Магазин не принадлежит выбранной организации")
+            organization_id = store.organization_id
+        elif organization_id is not None and db.get(Organization, organization_id) is None:
+            raise HTTPException(status_code=404, detail="Организация не найдена")
+
+        db.info["organization_id"] = organization_id
+        db.info["store_id"] = x_store_id
         yield db
     finally:
         db.close()
 
+
+def with_store_stock(product: Product, store_stock: StoreStock | None) -> ProductOut:
+    """Подставляет цену и остаток магазина вместо общих значений каталога."""
+    product_out = ProductOut.model_validate(product)
+    if store_stock is None:
+        # Товар не заведен в магазине: цена общая, остатка нет
+        return product_out.model_copy(update={"stock": 0.0})
+    return product_out.model_copy(update={
+        "price": store_stock.price if store_stock.price is not None else product.price,
+        "stock": store_stock.stock,
+    })
+
+
+def store_products_query(db: Session, store_id: int):
+    """Товары с ценой/остатком магазина: LEFT JOIN по первичному ключу (store_id, product_id)."""
+    return db.query(Product, StoreStock).outerjoin(
+        StoreStock,
+        and_(StoreStock.product_id == Product.id, StoreStock.store_id == store_id)
+    )
+
+
+def organization_counterparties_query(db: Session, organization_id: int):
+    """Контрагенты, привязанные к организации, плюс общие (без привязок)."""
+    linked = exists().where(and_(
+        OrganizationCounterparty.organization_id == organization_id,
+        OrganizationCounterparty.counterparty_id == Counterparty.id
+    ))
+    shared = ~exists().where(OrganizationCounterparty.counterparty_id == Counterparty.id)
+    return db.query(Counterparty).filter(or_(linked, shared))
+
+
+def upsert_store_stock(db: Session, store_id: int, product_id: int, price: float | None, stock: float) -> StoreStock:
+    """Создает или обновляет цену и остаток товара в магазине (без коммита)."""
+    db_store_stock = db.get(StoreStock, (store_id, product_id))
+    if db_store_stock is None:
+        db_store_stock = StoreStock(store_id=store_id, product_id=product_id)
+        db.add(db_store_stock)
+    
+    db_store_stock.price = price
+    db_store_stock.stock = stock
+    return db_store_stock
+
 # --- Вспомогательная функция для рендеринга страниц-заглушек (без изменений) ---
 
 def render_page(page_name: str, title: str, content: str) -> str:
@@ -210,11 +335,16 @@ async def serve_static_pages(page_name: str):
 def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     """
     Создает новый товар. Сначала добавляет запись в products, затем - в product_details.
+    В контексте магазина (X-Store-Id) остаток записывается в store_stock этого магазина,
+    а цена становится общей ценой каталога.
     """
+    store_id = db.info.get("store_id")
+    
     # 1. Отделяем данные для Product и ProductDetail
     product_data = product.model_dump(exclude={'details', 'is_active'}, exclude_unset=True)
     details_data = product.details.model_dump(exclude_unset=True) if product.details else None
     
+    store_stock_value = product_data.pop('stock', 0.0) if store_id is not None else None
     db_product = Product(**product_data)
     
     try:
@@ -231,10 +361,16 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
             )
             db.add(db_details)
         
+        # 4. Остаток магазина
+        if store_id is not None:
+            upsert_store_stock(db, store_id, db_product.id, None, store_stock_value)
+        
         db.commit()
         db.refresh(db_product)
         
-        # 4. Возвращаем результат. SQLAlchemy автоматически подтянет details
+        # 5. Возвращаем результат. SQLAlchemy автоматически подтянет details
+        if store_id is not None:
+            return with_store_stock(db_product, db.get(StoreStock, (store_id, db_product.id)))
         return db_product
         
     except IntegrityError as e:
@@ -257,11 +393,18 @@ def read_products(
     category_id: int | None = None,
     db: Session = Depends(get_db)
 ):
-    """Получает список всех товаров с их деталями."""
+    """Получает список всех товаров с их деталями (с ценами/остатками магазина из X-Store-Id)."""
+    store_id = db.info.get("store_id")
     query = db.query(Product)
     
+    if store_id is not None:
+        query = store_products_query(db, store_id)
+    
     if category_id is not None:
         query = query.filter(Product.category_id == category_id)
+    
+    if store_id is not None:
+        return [with_store_stock(product, store_stock) for product, store_stock in query.all()]
         
     products = query.all()  # SQLAlchemy выполнит JOIN, чтобы получить details
     return products
@@ -272,18 +415,43 @@ def read_product(product_id: int, db: Session = Depends(get_db)):
     db_product = db.query(Product).filter(Product.id == product_id).first()
     if db_product is None:
         raise HTTPException(status_code=404, detail="Товар не найден")
+    
+    store_id = db.info.get("store_id")
+    if store_id is not None:
+        return with_store_stock(db_product, db.get(StoreStock, (store_id, product_id)))
     # Детали будут автоматически включены в ответ благодаря relationship
     return db_product
 
 # 🔴 Обновление товара - требует обновления двух таблиц
 @app.put("/api/products/{product_id}", response_model=ProductOut)
 def update_product(product_id: int, product: ProductCreate, db: Session = Depends(get_db)):
+    """
+    Обновляет товар. В контексте магазина (X-Store-Id) остаток пишется в store_stock
+    этого магазина, общие цена и остаток каталога не меняются. Цена магазина
+    переопределяется, только если она отличается от цены каталога; совпадающая цена
+    снимает переопределение (магазин снова следует цене каталога).
+    """
     db_product = db.query(Product).filter(Product.id == product_id).first()
     if db_product is None:
         raise HTTPException(status_code=404, detail="Товар не найден")
     
+    store_id = db.info.get("store_id")
+    
     # 1. Обновляем основные поля (Product)
     product_data = product.model_dump(exclude={'details'}, exclude_unset=True)
+    if store_id is not None:
+        db_store_stock = db.get(StoreStock, (store_id, product_id))
+        store_price = db_store_stock.price if db_store_stock is not None else None
+        store_stock_value = db_store_stock.stock if db_store_stock is not None else 0.0
+        
+        # Не переданные поля сохраняют текущие значения магазина (как exclude_unset для каталога)
+        if 'price' in product_data:
+            price = product_data.pop('price')
+            store_price = price if price != db_product.price else None
+        if 'stock' in product_data:
+            store_stock_value = product_data.pop('stock')
+        
+        upsert_store_stock(db, store_id, product_id, store_price, store_stock_value)
     for key, value in product_data.items():
         setattr(db_product, key, value)
     
@@ -307,6 +475,8 @@ def update_product(product_id: int, product: ProductCreate, db: Session = Depend
     try:
         db.commit()
         db.refresh(db_product)
+        if store_id is not None:
+            return with_store_stock(db_product, db.get(StoreStock, (store_id, product_id)))
         return db_product
     except IntegrityError as e:
         db.rollback() 
@@ -324,10 +494,19 @@ def update_product(product_id: int, product: ProductCreate, db: Session = Depend
 # 🔴 Удаление товара: CASCADE удалит связанные детали
 @app.delete("/api/products/{product_id}", status_code=204)
 def delete_product(product_id: int, db: Session = Depends(get_db)):
+    """Удаляет товар. В контексте магазина (X-Store-Id) товар убирается только из этого магазина."""
     db_product = db.query(Product).filter(Product.id == product_id).first()
     if db_product is None:
         raise HTTPException(status_code=404, detail="Товар не найден")
     
+    store_id = db.info.get("store_id")
+    if store_id is not None:
+        db_store_stock = db.get(StoreStock, (store_id, product_id))
+        if db_store_stock is not None:
+            db.delete(db_store_stock)
+            db.commit()
+        return
+    
     db.delete(db_product)
     # Благодаря ondelete='CASCADE' в models.py, запись в ProductDetail удалится автоматически.
     db.commit()
@@ -337,7 +516,7 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
 # (Остальные API-маршруты и функции не изменены, но включены для полноты)
 
 @app.put("/api/categories/{category_id}", response_model=CategoryOut)
-def update_category(category_id: int, category: CategoryCreate, db: Session = Depends(get_db)):
+def update_category(category_id: int, category: CategoryCreate, db: Session = Depends(get_global_db)):
     # ... (Ваш код) ...
     db_category = db.query(Category).filter(Category.id == category_id).first()
     if db_category is None:
@@ -351,7 +530,7 @@ def update_category(category_id: int, category: CategoryCreate, db: Session = De
     return db_category
 
 @app.delete("/api/categories/{category_id}", status_code=204)
-def delete_category(category_id: int, db: Session = Depends(get_db)):
+def delete_category(category_id: int, db: Session = Depends(get_global_db)):
     # ... (Ваш код) ...
     db_category = db.query(Category).filter(Category.id == category_id).first()
     if db_category is None:
@@ -362,7 +541,7 @@ def delete_category(category_id: int, db: Session = Depends(get_db)):
     return
 
 @app.post("/api/categories/", response_model=CategoryOut, status_code=201)
-def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
+def create_category(category: CategoryCreate, db: Session = Depends(get_global_db)):
     # ... (Ваш код) ...
     db_category = Category(**category.model_dump())
     db.add(db_category)
@@ -371,32 +550,126 @@ def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
     return db_category
 
 @app.get("/api/categories/", response_model=list[CategoryOut])
-def read_categories(db: Session = Depends(get_db)):
+def read_categories(db: Session = Depends(get_global_db)):
     # ... (Ваш код) ...
     categories = db.query(Category).filter(Category.parent_id == None).all()
     return categories
 
 @app.post("/api/counterparties/", response_model=CounterpartyOut, status_code=201)
 def create_counterparty(counterparty: CounterpartyCreate, db: Session = Depends(get_db)):
-    # ... (Ваш код) ...
+    """
+    Создает контрагента. БИН/ИИН уникален глобально (это одно юрлицо), поэтому в контексте
+    организации существующий контрагент другой организации просто привязывается к ней.
+    """
+    organization_id = db.info.get("organization_id")
+    
     if counterparty.bin:
         existing = db.query(Counterparty).filter(Counterparty.bin == counterparty.bin).first()
         if existing:
-            raise HTTPException(status_code=400, detail="Контрагент с таким БИН/ИИН уже существует")
+            links = db.query(OrganizationCounterparty.organization_id).filter(
+                OrganizationCounterparty.counterparty_id == existing.id
+            ).all()
+            linked_organizations = {link.organization_id for link in links}
+            
+            # Контрагент уже виден этой организации (привязан к ней или общий)
+            if organization_id is None or not linked_organizations or organization_id in linked_organizations:
+                raise HTTPException(status_code=400, detail="Контрагент с таким БИН/ИИН уже существует")
+            
+            db.add(OrganizationCounterparty(organization_id=organization_id, counterparty_id=existing.id))
+            db.commit()
+            db.refresh(existing)
+            return existing
             
     db_counterparty = Counterparty(**counterparty.model_dump(exclude_unset=True))
     db.add(db_counterparty)
+    
+    # В контексте организации контрагент привязывается к ней
+    if organization_id is not None:
+        db.flush()
+        db.add(OrganizationCounterparty(organization_id=organization_id, counterparty_id=db_counterparty.id))
+    
     db.commit()
     db.refresh(db_counterparty)
     return db_counterparty
 
 @app.get("/api/counterparties/", response_model=list[CounterpartyOut])
 def read_counterparties(db: Session = Depends(get_db)):
-    # ... (Ваш код) ...
-    counterparties = db.query(Counterparty).all()
+    """Контрагенты организации из X-Organization-Id плюс общие (без привязки)."""
+    query = db.query(Counterparty)
+    
+    organization_id = db.info.get("organization_id")
+    if organization_id is not None:
+        query = organization_counterparties_query(db, organization_id)
+        
+    counterparties = query.all()
     return counterparties
 
 
+# --- API-маршруты Организаций и Магазинов ---
+
+@app.post("/api/organizations/", response_model=OrganizationOut, status_code=201)
+def create_organization(organization: OrganizationCreate, db: Session = Depends(get_global_db)):
+    if organization.bin:
+        existing = db.query(Organization).filter(Organization.bin == organization.bin).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="Организация с таким БИН уже существует")
+    
+    db_organization = Organization(**organization.model_dump(exclude_unset=True))
+    db.add(db_organization)
+    db.commit()
+    db.refresh(db_organization)
+    return db_organization
+
+@app.get("/api/organizations/", response_model=list[OrganizationOut])
+def read_organizations(db: Session = Depends(get_global_db)):
+    return db.query(Organization).all()
+
+@app.post("/api/stores/", response_model=StoreOut, status_code=201)
+def create_store(store: StoreCreate, db: Session = Depends(get_db)):
+    organization_id = db.info.get("organization_id")
+    if organization_id is not None and store.organization_id != organization_id:
+        raise HTTPException(status_code=403, detail="Нельзя создать магазин в другой организации")
+    if db.get(Organization, store.organization_id) is None:
+        raise HTTPException(status_code=404, detail="Организация не найдена")
+    
+    db_store = Store(**store.model_dump())
+    db.add(db_store)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Магазин '{store.name}' уже существует в этой организации")
+    db.refresh(db_store)
+    return db_store
+
+@app.get("/api/stores/", response_model=list[StoreOut])
+def read_stores(db: Session = Depends(get_db)):
+    """Магазины организации из X-Organization-Id (или все, если заголовка нет)."""
+    query = db.query(Store)
+    
+    organization_id = db.info.get("organization_id")
+    if organization_id is not None:
+        query = query.filter(Store.organization_id == organization_id)
+    return query.all()
+
+@app.put("/api/stores/{store_id}/stock/{product_id}", response_model=StoreStockOut)
+def update_store_stock(store_id: int, product_id: int, store_stock: StoreStockBase, db: Session = Depends(get_db)):
+    """Задает цену и остаток товара в магазине (создает запись, если ее не было)."""
+    db_store = db.get(Store, store_id)
+    if db_store is None:
+        raise HTTPException(status_code=404, detail="Магазин не найден")
+    organization_id = db.info.get("organization_id")
+    if organization_id is not None and db_store.organization_id != organization_id:
+        raise HTTPException(status_code=403, detail="Магазин не принадлежит выбранной организации")
+    if db.get(Product, product_id) is None:
+        raise HTTPException(status_code=404, detail="Товар не найден")
+    
+    db_store_stock = upsert_store_stock(db, store_id, product_id, store_stock.price, store_stock.stock)
+    db.commit()
+    db.refresh(db_store_stock)
+    return db_store_stock
+
+
 # --- Функция для добавления начальных данных (Seeding) ---
 
 def create_initial_categories():
@@ -427,6 +700,23 @@ def create_initial_categories():
         db.close()
 
 
+def create_initial_organizations():
+    """Создает начальные организации, если таблица Organization пуста."""
+    db = SessionLocal()
+    try:
+        if db.query(Organization).count() == 0:
+            # Селектор в POS заполняется из /api/organizations/, id не важны
+            db.add(Organization(name="Организация 1 (Моя)"))
+            db.add(Organization(name="Организация 2 (Доп)"))
+            db.commit()
+            print("Начальные организации успешно добавлены.")
+    except Exception as e:
+        print(f"Ошибка при добавлении начальных организаций: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
 # --- Жизненный цикл Сервера ---
 
 @app.on_event("startup")
@@ -434,6 +724,7 @@ def on_startup():
     create_db_and_tables()
     print("База данных и таблицы успешно инициализированы.")
     create_initial_categories() 
+    create_initial_organizations()
 
 # --- Тестовый API-маршрут (Статус) ---
 @app.get("/api/status")
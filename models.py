@@ -1,7 +1,7 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, ForeignKey
+from sqlalchemy import create_engine, event, text, Column, Integer, String, Float, Boolean, ForeignKey
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
-from sqlalchemy.schema import UniqueConstraint 
+from sqlalchemy.schema import UniqueConstraint, Index, DDL
 
 # --- 1. Инициализация Базы Данных ---
 
@@ -20,6 +20,16 @@ engine = create_engine(
 Base = declarative_base()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Число HASH-секций таблицы store_stock (только PostgreSQL). 0 - без секционирования.
+# Применяется ТОЛЬКО при первом создании таблицы: существующая таблица не пересоздается.
+_partitions_raw = os.environ.get('STORE_STOCK_PARTITIONS', '0').strip() or '0'
+if not _partitions_raw.isdigit():
+    raise ValueError(
+        f"STORE_STOCK_PARTITIONS должно быть целым числом >= 0, получено: '{_partitions_raw}'"
+    )
+STORE_STOCK_PARTITIONS = int(_partitions_raw)
+USE_PARTITIONING = STORE_STOCK_PARTITIONS > 0 and DATABASE_URL.startswith("postgresql")
+
 # --- 2. Определение Моделей (Таблиц) ---
 
 class Category(Base):
@@ -124,8 +134,113 @@ class Counterparty(Base):
         return f"<Counterparty(id={self.id}, name='{self.name}', bin='{self.bin}')>"
 
 
-# --- 3. Создание Таблиц ---
+# --- 3. Организации и Магазины (Мульти-арендность) ---
+# Старые таблицы не меняются: цены/остатки магазинов и привязка контрагентов
+# хранятся в отдельных таблицах. Все составные ключи начинаются с ключа арендатора.
+
+class Organization(Base):
+    """Юридическое лицо (арендатор)."""
+    __tablename__ = "organizations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False)
+    bin = Column(String(12), unique=True, nullable=True)
+
+    stores = relationship("Store", back_populates="organization")
+
+    def __repr__(self):
+        return f"<Organization(id={self.id}, name='{self.name}')>"
+
+
+class Store(Base):
+    """Магазин (точка продаж) организации."""
+    __tablename__ = "stores"
+
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey('organizations.id', ondelete='CASCADE'), nullable=False)
+    name = Column(String(255), nullable=False)
+
+    organization = relationship("Organization", back_populates="stores")
+
+    __table_args__ = (
+        UniqueConstraint('organization_id', 'name', name='ix_stores_organization_name'),
+    )
+
+    def __repr__(self):
+        return f"<Store(id={self.id}, organization_id={self.organization_id}, name='{self.name}')>"
+
+
+class StoreStock(Base):
+    """
+    Цена и остаток товара в конкретном магазине.
+    Если цена не задана, используется общая цена из таблицы 'products'.
+    При STORE_STOCK_PARTITIONS > 0 (PostgreSQL) таблица секционируется по HASH (store_id),
+    но только если она создается впервые - уже существующая таблица остается как есть.
+    """
+    __tablename__ = "store_stock"
+
+    # Первичный ключ (store_id, product_id) - выборка по магазину идет по индексу
+    store_id = Column(Integer, ForeignKey('stores.id', ondelete='CASCADE'), primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    price = Column(Float, nullable=True)
+    stock = Column(Float, default=0.0, nullable=False)
+
+    __table_args__ = (
+        Index('ix_store_stock_product_id', 'product_id'),
+        {'postgresql_partition_by': 'HASH (store_id)'} if USE_PARTITIONING else {},
+    )
+
+    def __repr__(self):
+        return f"<StoreStock(store_id={self.store_id}, product_id={self.product_id}, stock={self.stock})>"
+
+
+class OrganizationCounterparty(Base):
+    """
+    Привязка контрагента к организации.
+    Контрагенты без привязок остаются общими и видны всем организациям.
+    """
+    __tablename__ = "organization_counterparties"
+
+    organization_id = Column(Integer, ForeignKey('organizations.id', ondelete='CASCADE'), primary_key=True)
+    counterparty_id = Column(Integer, ForeignKey('counterparties.id', ondelete='CASCADE'), primary_key=True)
+
+    __table_args__ = (
+        Index('ix_organization_counterparties_counterparty_id', 'counterparty_id'),
+    )
+
+
+if USE_PARTITIONING:
+    # Секции создаются сразу после родительской таблицы (PostgreSQL 11+)
+    for remainder in range(STORE_STOCK_PARTITIONS):
+        event.listen(
+            StoreStock.__table__,
+            "after_create",
+            DDL(
+                f"CREATE TABLE IF NOT EXISTS store_stock_p{remainder} PARTITION OF store_stock "
+                f"FOR VALUES WITH (MODULUS {STORE_STOCK_PARTITIONS}, REMAINDER {remainder})"
+            ),
+        )
+
+
+# --- 4. Создание Таблиц ---
 
 def create_db_and_tables():
-    """Создает все таблицы в базе данных."""
+    """
+    Создает все таблицы в базе данных.
+    Секционирование store_stock задается только при первом создании таблицы.
+    """
     Base.metadata.create_all(bind=engine)
+    
+    if USE_PARTITIONING:
+        # relkind 'p' - секционированная таблица PostgreSQL
+        with engine.connect() as connection:
+            relkind = connection.execute(
+                text("SELECT relkind FROM pg_class WHERE oid = to_regclass('store_stock')")
+            ).scalar()
+        if relkind != 'p':
+            print(
+                f"ВНИМАНИЕ: STORE_STOCK_PARTITIONS={STORE_STOCK_PARTITIONS}, но таблица store_stock "
+                "уже существует без секционирования. Секции не созданы - нужна ручная миграция."
+            )
+        else:
+            print(f"Таблица store_stock секционирована: HASH (store_id), {STORE_STOCK_PARTITIONS} секций.")
@@ -10,6 +10,7 @@ document.addEventListener('DOMContentLoaded', () => {
     let currentTotal = 0;
     let selectedPaymentMode = 'cash';
     let selectedOrganization = null;
+    let selectedStoreId = '';
     let selectedCounterpartyId = 'none';
 
     // УДАЛЕНО: window.isWakeWordDetected
@@ -26,6 +27,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const clearCartBtn = document.getElementById('clear-cart');
     const completeSaleBtn = document.getElementById('complete-sale');
     const productListButtons = document.getElementById('product-list');
+    const storeSelect = document.getElementById('store-select');
     // УДАЛЕНО: voiceInputBtn
     // УДАЛЕНО: voiceStatusEl
 
@@ -457,7 +459,7 @@ document.addEventListener('DOMContentLoaded', () => {
         try {
             const response = await fetch('/api/counterparties/', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: { 'Content-Type': 'application/json', ...tenantHeaders() },
                 body: JSON.stringify(newCounterparty)
             });
              
@@ -493,15 +495,75 @@ document.addEventListener('DOMContentLoaded', () => {
         selectedCounterpartyId = e.target.value;
     });
 
+    // Магазины и контрагенты зависят от выбранной организации
+    organizationSelect.addEventListener('change', async () => {
+        selectedOrganization = organizationSelect.value;
+        await fetchStores();
+        fetchProducts();
+        fetchCounterparties();
+    });
+
+    // Цены и остатки товаров зависят от выбранного магазина
+    storeSelect.addEventListener('change', () => {
+        selectedStoreId = storeSelect.value;
+        fetchProducts();
+    });
+
 
     // =================================================================
     //          --- ЛОГИКА CRUD (Каталог) ---
     // =================================================================
 
+    /** Заголовки контекста арендатора (организация и магазин) для API. */
+    function tenantHeaders() {
+        const headers = {};
+        if (organizationSelect.value) headers['X-Organization-Id'] = organizationSelect.value;
+        if (storeSelect.value) headers['X-Store-Id'] = storeSelect.value;
+        return headers;
+    }
+
+    /** Загружает магазины выбранной организации и рендерит SELECT. */
+    async function fetchStores() {
+        try {
+            // Магазины зависят только от организации, выбранный магазин здесь не передается
+            const headers = organizationSelect.value ? { 'X-Organization-Id': organizationSelect.value } : {};
+            const response = await fetch('/api/stores/', { headers });
+            if (!response.ok) throw new Error('Ошибка при получении списка магазинов');
+            const stores = await response.json();
+             
+            // Пустое значение - общий каталог (цены и остатки без привязки к магазину)
+            storeSelect.innerHTML = '<option value="">-- Общий каталог --</option>' + stores.map(s =>
+                `<option value="${s.id}" ${s.id.toString() === selectedStoreId ? 'selected' : ''}>${s.name}</option>`
+            ).join('');
+            selectedStoreId = storeSelect.value;
+        } catch (error) {
+            console.error('Ошибка загрузки магазинов:', error);
+            storeSelect.innerHTML = '<option value="">-- Общий каталог --</option>';
+            selectedStoreId = '';
+        }
+    }
+
+    /** Загружает список организаций и рендерит SELECT. */
+    async function fetchOrganizations() {
+        try {
+            const response = await fetch('/api/organizations/');
+            if (!response.ok) throw new Error('Ошибка при получении списка организаций');
+            const organizations = await response.json();
+             
+            organizationSelect.innerHTML = organizations.map(o =>
+                `<option value="${o.id}" ${o.id.toString() === selectedOrganization ? 'selected' : ''}>${o.name}</option>`
+            ).join('');
+            selectedOrganization = organizationSelect.value || null;
+        } catch (error) {
+            console.error('Ошибка загрузки организаций:', error);
+            organizationSelect.innerHTML = '<option value="">-- Ошибка загрузки --</option>';
+        }
+    }
+
     /** Загружает список контрагентов и рендерит SELECT. */
     async function fetchCounterparties() {
         try {
-            const response = await fetch('/api/counterparties/');
+            const response = await fetch('/api/counterparties/', { headers: tenantHeaders() });
             if (!response.ok) throw new Error('Ошибка при получении списка контрагентов');
             counterpartyCache = await response.json();
             renderCounterpartySelect();
@@ -533,7 +595,7 @@ document.addEventListener('DOMContentLoaded', () => {
         crudProductList.innerHTML = '<p style="text-align: center;"><i class="fas fa-spinner fa-spin"></i> Загрузка...</p>';
          
         try {
-            const response = await fetch('/api/products/');
+            const response = await fetch('/api/products/', { headers: tenantHeaders() });
             if (!response.ok) throw new Error('Ошибка сети при получении товаров');
              
             const products = await response.json();
@@ -584,7 +646,7 @@ document.addEventListener('DOMContentLoaded', () => {
         try {
             const response = await fetch(url, {
                 method: method,
-                headers: { 'Content-Type': 'application/json' },
+                headers: { 'Content-Type': 'application/json', ...tenantHeaders() },
                 body: data ? JSON.stringify(data) : undefined
             });
 
@@ -701,7 +763,7 @@ document.addEventListener('DOMContentLoaded', () => {
     testApiBtn.addEventListener('click', async () => {
         displayMessage(apiStatus, '<i class="fas fa-sync fa-spin"></i> Проверка подключения...', 'info');
         try {
-            const response = await fetch('/api/status');
+            const response = await fetch('/api/status', { headers: tenantHeaders() });
             if (response.ok) {
                 const status = await response.json();
                 displayMessage(apiStatus, `✅ API работает! Версия: ${status.version || '1.0'} | БД: ${status.db_info || 'OK'}`, 'success');
@@ -736,8 +798,12 @@ document.addEventListener('DOMContentLoaded', () => {
     // =================================================================
     //          --- ИНИЦИАЛИЗАЦИЯ ---
     // =================================================================
-    fetchProducts();
-    fetchCounterparties();
+    fetchOrganizations()
+        .then(fetchStores)
+        .then(() => {
+            fetchProducts();
+            fetchCounterparties();
+        });
     renderCart();
     hideAllModals(); 
     scanInput.focus();